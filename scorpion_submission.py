@@ -4,19 +4,63 @@ import requests
 import argparse
 import os
 import sys
-import subprocess
-from urllib.parse import quote
+import shlex
+import tempfile
+import threading
+import functools
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import quote, urlencode
 from datetime import datetime, timezone
 from dateutil.relativedelta import relativedelta
 
+try:
+    import ijson  # Optional, streams GitHub release listings instead of parsing them in full
+except ImportError:
+    ijson = None
+try:
+    import orjson  # Optional, C-accelerated JSON parsing and serialization
+except ImportError:
+    orjson = None
+
 # --- Secure Configuration Loading ---
 # Tokens are read from environment variables for security.
 SCORPION_API_URL = "https://scorpion.bi.denbi.de"
+MATOMO_API_URL = "https://www.plabipd.de/analytics/"
+SERPAPI_URL = "https://serpapi.com/search.json"
+GITHUB_API_URL = "https://api.github.com"
 SCORPION_API_KEY = os.getenv("SCORPION_API_KEY")
 MATOMO_AUTH_TOKEN = os.getenv("MATOMO_AUTH_TOKEN")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN") # Optional, for higher API rate limits
 SITE_ID = '1'
+MAX_WORKERS = 16 # Size of the shared thread pool used for all external fetches
+HTTP_POOL_SIZE = 32 # Keep-alive connections kept open per API host
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "scorpion") # On-disk cache shared across runs
+
+# --- Shared HTTP Session ---
+def _make_session() -> requests.Session:
+    """
+    Creates the HTTP session shared by all API calls. Every API host gets its own connection pool, so the worker
+    threads reuse keep-alive TCP/TLS connections, and transient 429/5xx responses are retried with backoff.
+    """
+    session = requests.Session()
+    retry_statuses = [429, 500, 502, 503, 504]
+    for host_url in (GITHUB_API_URL, "https://serpapi.com", "https://www.plabipd.de", SCORPION_API_URL):
+        allowed_methods = Retry.DEFAULT_ALLOWED_METHODS
+        # Matomo queries are sent as POST but are read-only, so they are safe to retry; ScorPIoN submissions are not
+        if MATOMO_API_URL.startswith(host_url):
+            allowed_methods = allowed_methods | {"POST"}
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=retry_statuses, allowed_methods=allowed_methods)
+        session.mount(host_url, HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries))
+    return session
+
+SESSION = _make_session()
+
+# Serializes read-modify-write cycles on cache files between worker threads
+_CACHE_LOCK = threading.Lock()
 
 # --- DEFINITIVE SERVICE CONFIGURATION ---
 # The 'scorpion_service_name' values have been updated to exactly match the names in the ScorPIoN API.
@@ -61,6 +105,14 @@ SERVICES_CONFIG = [
     }
 ]
 
+# Pre-encode the static Matomo filter values once, so the batched sub-requests do not re-quote them on every run
+for _service in SERVICES_CONFIG:
+    _details = _service['source_details']
+    if 'label' in _details:
+        _service['_encoded_label'] = quote(_details['label'])
+    if 'download_url' in _details:
+        _service['_encoded_url'] = quote(_details['download_url'])
+
 # --- KPI MAPPINGS ---
 # Map raw keys from different Matomo APIs to a common intermediate name
 MATOMO_PAGE_TITLE_TO_INTERMEDIATE = {
@@ -79,106 +131,246 @@ INTERMEDIATE_NAME_TO_SCORPION_KPI = {
     'Actions per Visit': 'Actions per Visit', 'Visitors': 'Unique Users',
     'Visits': 'Visits', 'Citations': 'Citations', 'Downloads': 'Downloads'
 }
+# Precomputed (raw key, ScorPIoN KPI, also submitted as 'Pageviews') triples for each Matomo-backed source type
+KPI_PIPELINE = {
+    source_type: [(api_key, INTERMEDIATE_NAME_TO_SCORPION_KPI[im_name], im_name == 'Actions') for api_key, im_name in mapping.items()]
+    for source_type, mapping in (('matomo_page_title', MATOMO_PAGE_TITLE_TO_INTERMEDIATE),
+                                 ('matomo_site_summary', MATOMO_SUMMARY_TO_INTERMEDIATE))
+}
+KPI_PIPELINE['matomo_download'] = [('nb_hits', INTERMEDIATE_NAME_TO_SCORPION_KPI['Downloads'], False)]
+# Map Matomo-backed source types to the Matomo API method providing their primary data
+MATOMO_SOURCE_TYPE_TO_METHOD = {
+    'matomo_page_title': 'Actions.getPageTitles',
+    'matomo_download': 'Actions.getDownload',
+    'matomo_site_summary': 'VisitsSummary.get'
+}
 
-def _execute_matomo_curl(api_method: str, report_date: str, extra_params_str: str = "") -> dict | None:
-    """Generic function to execute a Matomo API curl command."""
-    url = (f"'https://www.plabipd.de/analytics/?module=API&method={api_method}"
-           f"&idSite={SITE_ID}&period=month&date={report_date}&format=JSON{extra_params_str}'")
-    command = f"curl -s -X POST {url} -d 'token_auth={MATOMO_AUTH_TOKEN}'"
-    print(f"INFO: Executing curl for Matomo method: '{api_method}' for date {report_date}")
+def _json_loads(data: bytes):
+    """Parses a JSON document with orjson if it is installed, falling back to the standard library."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _json_dumps(obj) -> bytes:
+    """Serializes an object to UTF-8 encoded JSON with orjson if it is installed, falling back to the standard library."""
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode("utf-8")
+
+def _build_matomo_sub_request(service_info: dict, report_date: str) -> str:
+    """Builds the URL-encoded Matomo query string fetching the primary data of a single service."""
+    source_type = service_info['source_type']
+    query = urlencode({"method": MATOMO_SOURCE_TYPE_TO_METHOD[source_type], "idSite": SITE_ID,
+                       "period": "month", "date": report_date, "format": "JSON"})
+    if source_type == 'matomo_page_title':
+        query += f"&label={service_info['_encoded_label']}"
+    elif source_type == 'matomo_download':
+        query += f"&downloadUrl={service_info['_encoded_url']}"
+    return query
+
+def get_matomo_bulk_data(services: list, report_date: str) -> dict:
+    """
+    Fetches the primary analytics of all Matomo-backed services with a single API.getBulkRequest call.
+    Returns a dictionary keyed by the services' display_name; failed sub-requests are left out.
+    """
+    if not services: return {}
+    sub_requests = {f"urls[{i}]": _build_matomo_sub_request(s, report_date) for i, s in enumerate(services)}
+    params = {"module": "API", "method": "API.getBulkRequest", "format": "JSON"}
+    print(f"INFO: Executing Matomo bulk request with {len(services)} sub-requests for date {report_date}")
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        if not result.stdout:
-            print(f"WARNING: Matomo API returned empty response for method {api_method}")
-            return None
-        data = json.loads(result.stdout)
+        response = SESSION.post(MATOMO_API_URL, params=params, data={"token_auth": MATOMO_AUTH_TOKEN, **sub_requests}, timeout=30)
+        response.raise_for_status()
+        if not response.content:
+            print("WARNING: Matomo API returned empty response for bulk request")
+            return {}
+        results = _json_loads(response.content)
+    except (requests.RequestException, ValueError) as e:
+        print(f"ERROR during Matomo bulk fetch: {e}")
+        return {}
+
+    # A failure of the whole batch is reported as a single error object instead of a list
+    if not isinstance(results, list):
+        print(f"ERROR during Matomo bulk fetch: {results}")
+        return {}
+
+    bulk_data = {}
+    for service_info, data in zip(services, results):
+        display_name = service_info['display_name']
+        if isinstance(data, dict) and data.get("result") == "error":
+            print(f"ERROR during Matomo fetch for {display_name}: {data.get('message')}")
+            continue
         # Handle cases where Matomo returns a list (e.g., for page titles) vs. a direct dictionary (e.g., for summaries)
-        return data[0] if isinstance(data, list) and data else data
-    except (subprocess.CalledProcessError, json.JSONDecodeError) as e:
-        print(f"ERROR during Matomo fetch for {api_method}: {e}")
-        return None
+        bulk_data[display_name] = data[0] if isinstance(data, list) and data else data
+    return bulk_data
 
-def get_matomo_page_title_data(label: str, report_date: str) -> dict | None:
-    """Fetches analytics data for a specific page title using curl."""
-    encoded_label = quote(label)
-    return _execute_matomo_curl("Actions.getPageTitles", report_date, extra_params_str=f"&label={encoded_label}")
+def _load_json_cache(path: str) -> dict:
+    """Reads a JSON cache file, returning an empty dictionary if it is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-def get_matomo_download_data(download_url: str, report_date: str) -> dict | None:
-    """Fetches analytics data for a specific download URL using curl."""
-    encoded_url = quote(download_url)
-    return _execute_matomo_curl("Actions.getDownload", report_date, extra_params_str=f"&downloadUrl={encoded_url}")
+def _write_json_cache(path: str, data: dict):
+    """Atomically replaces a JSON cache file by writing to a temporary file next to it first."""
+    cache_dir = os.path.dirname(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        print(f"WARNING: Could not write cache file '{path}': {e}")
 
-def get_matomo_summary_data(report_date: str) -> dict | None:
-    """Fetches overall site summary analytics using curl."""
-    return _execute_matomo_curl("VisitsSummary.get", report_date)
+def _iter_release_page(response: requests.Response):
+    """Yields the releases of a GitHub releases page, streaming the JSON array with ijson if it is installed."""
+    if ijson is None:
+        yield from _json_loads(response.content)
+    else:
+        response.raw.decode_content = True
+        try:
+            yield from ijson.items(response.raw, 'item')
+        except ijson.JSONError as e:
+            raise ValueError(f"Malformed GitHub releases response: {e}") from e
+
+def _fetch_github_releases(repo: str, headers: dict, use_cache: bool, tags: list | None = None) -> list:
+    """
+    Fetches the releases of a GitHub repository page by page as slim {'tag_name', 'download_count'} entries.
+    Cached pages are revalidated with their ETag, so unchanged pages cost a 304 Not Modified instead of a full download.
+    If tags are specified, reading stops as soon as all of them have been seen.
+    """
+    cache_path = os.path.join(CACHE_DIR, f"gh-{repo.replace('/', '_')}.json")
+    page_cache = _load_json_cache(cache_path) if use_cache else {}
+    updated_cache = {}
+    releases = []
+    tags_to_find = set(tags) if tags else None
+    url = f"{GITHUB_API_URL}/repos/{repo}/releases?per_page=100"
+    while url:
+        cached_page = page_cache.get(url)
+        # A partially read page can only be reused if it contains all tags still being searched for
+        if cached_page and not cached_page["complete"] and not (
+                tags_to_find and tags_to_find <= {release["tag_name"] for release in cached_page["releases"]}):
+            cached_page = None
+        page_headers = {**headers, 'If-None-Match': cached_page['etag']} if cached_page else headers
+        with SESSION.get(url, headers=page_headers, stream=True, timeout=30) as response:
+            if response.status_code == 304:
+                print(f"INFO: GitHub releases page of '{repo}' is unchanged, using cached copy.")
+                page = cached_page
+            else:
+                response.raise_for_status()
+                page = {"etag": response.headers.get("ETag"), "next": response.links.get("next", {}).get("url"),
+                        "complete": True, "releases": []}
+                remaining_tags = set(tags_to_find) if tags_to_find is not None else None
+                for release in _iter_release_page(response):
+                    page["releases"].append({
+                        "tag_name": release.get("tag_name"),
+                        "download_count": sum(int(asset.get("download_count", 0)) for asset in release.get("assets", []))
+                    })
+                    if remaining_tags is not None:
+                        remaining_tags.discard(release.get("tag_name"))
+                        if not remaining_tags:
+                            page["complete"] = False
+                            break
+        if page["etag"]:
+            updated_cache[url] = page
+        releases.extend(page["releases"])
+
+        if tags_to_find is not None:
+            tags_to_find -= {release["tag_name"] for release in page["releases"]}
+            if not tags_to_find: break
+        url = page["next"]
 
-def get_github_release_downloads(repo: str, tags: str | None = None) -> int:
+    if use_cache:
+        with _CACHE_LOCK:
+            _write_json_cache(cache_path, updated_cache)
+    return releases
+
+def get_github_release_downloads(repo: str, tags: str | None = None, use_cache: bool = True) -> int:
     """
     Fetches download count from a GitHub repository.
     If tags are specified, it sums downloads for these releases only.
     Otherwise, it sums downloads for all assets in all releases.
     """
     total_downloads = 0
-    url = f"https://api.github.com/repos/{repo}/releases"
     headers = {}
     if GITHUB_TOKEN:
         headers['Authorization'] = f"token {GITHUB_TOKEN}"
 
     print(f"INFO: Querying GitHub API for releases of: '{repo}'")
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        releases = response.json()
+        releases = _fetch_github_releases(repo, headers, use_cache, tags)
 
         if tags:
             print(f"INFO: Searching for release with specific tags '{tags}'.")
             tags_to_find = set(tags)
             for release in releases:
-                if release.get("tag_name") in tags_to_find:
-                    print(f"INFO: Found release with tag '{release.get('tag_name')}'. Summing asset downloads.")
-                    for asset in release.get("assets", []):
-                        total_downloads += asset.get("download_count", 0)
-                    tags_to_find.remove(release.get("tag_name"))
+                if release["tag_name"] in tags_to_find:
+                    print(f"INFO: Found release with tag '{release['tag_name']}'. Summing asset downloads.")
+                    total_downloads += release["download_count"]
+                    tags_to_find.remove(release["tag_name"])
              
             if tags_to_find:
                 print(f"WARNING: Could not find releases for tags: {list(tags_to_find)} in repo '{repo}'.")
         else:
             print(f"INFO: No specific tags provided. Summing downloads for all releases.")
             for release in releases:
-                for asset in release.get("assets", []):
-                    total_downloads += asset.get("download_count", 0)
+                total_downloads += release["download_count"]
         
         return total_downloads
 
-    except requests.RequestException as e:
+    except (requests.RequestException, ValueError) as e:
         print(f"ERROR during GitHub fetch for {repo}: {e}")
         return 0
 
-def get_scholar_citations(publication_titles: list) -> int:
-    """Scrapes Google Scholar for citation counts for a list of publications."""
+def _fetch_one_citation(title: str) -> int | None:
+    """Queries SerpApi for the Google Scholar citation count of a single publication. Returns None on failure."""
+    print(f"INFO: Querying SerpApi for citations of: '{title[:40]}...'")
+    params = {"engine": "google_scholar", "q": title, "api_key": SERPAPI_KEY}
+    try:
+        response = SESSION.get(SERPAPI_URL, params=params, timeout=30)
+        response.raise_for_status()
+        data = _json_loads(response.content)
+    except (requests.RequestException, ValueError) as e:
+        print(f"WARNING: SerpApi query failed for '{title[:40]}...': {e}")
+        return None
+    if "error" in data:
+        print(f"WARNING: SerpApi reported an error for '{title[:40]}...': {data['error']}")
+        return None
+    top_result = (data.get("organic_results") or [{}])[0]
+    return top_result.get("inline_links", {}).get("cited_by", {}).get("total", 0)
+
+def get_scholar_citation(title: str, cache_month: str | None = None) -> int:
+    """
+    Scrapes Google Scholar for the citation count of a single publication; failed queries count as 0.
+    If cache_month (YYYY-MM) is given, the count is cached on disk for that month and reused by later runs.
+    """
     if not SERPAPI_KEY: return 0
-    total_citations = 0
-    for title in publication_titles:
-        print(f"INFO: Querying SerpApi for citations of: '{title[:40]}...'")
-        params = {"engine": "google_scholar", "q": title, "api_key": SERPAPI_KEY}
-        try:
-            response = requests.get("https://serpapi.com/search.json", params=params)
-            response.raise_for_status()
-            data = response.json()
-            total_citations += data.get("organic_results", [{}])[0].get("inline_links", {}).get("cited_by", {}).get("total", 0)
-        except Exception: continue
-    return total_citations
+    cache_path = os.path.join(CACHE_DIR, f"citations-{cache_month}.json") if cache_month else None
+    if cache_path:
+        cached = _load_json_cache(cache_path)
+        if title in cached:
+            print(f"INFO: Using cached citation count for: '{title[:40]}...'")
+            return cached[title]
 
+    count = _fetch_one_citation(title)
+    if count is None: return 0
+    if cache_path:
+        with _CACHE_LOCK:
+            _write_json_cache(cache_path, {**_load_json_cache(cache_path), title: count})
+    return count
+
+@functools.lru_cache(maxsize=1)
 def get_service_abbreviations() -> dict:
     """Gets all service names and their abbreviations from the ScorPIoN API."""
     print("INFO: Fetching service abbreviations from ScorPIoN API...")
     url = f"{SCORPION_API_URL}/denbi/api/v1/services"
     headers = {"X-API-Key": SCORPION_API_KEY}
     try:
-        response = requests.get(url, headers=headers)
+        response = SESSION.get(url, headers=headers, timeout=30)
         response.raise_for_status()
-        return {service['name']: service['abbreviation'] for service in response.json().get("result", [])}
-    except requests.RequestException as e:
+        return {service['name']: service['abbreviation'] for service in _json_loads(response.content).get("result", [])}
+    except (requests.RequestException, ValueError) as e:
         print(f"ERROR: Could not fetch service list from ScorPIoN: {e}")
         return {}
 
@@ -190,22 +382,23 @@ def submit_measurements_to_scorpion(service_abbreviation: str, measurements: lis
 
     if not is_live_run:
         print(f"\n--- [DRY RUN] Submission command for service '{service_abbreviation}' ---")
-        json_payload = json.dumps(measurements)
-        url = f"'{SCORPION_API_URL}/denbi/api/v1/measurements?service={service_abbreviation}'"
-        header_api_key = f"-H 'X-API-Key: {SCORPION_API_KEY}'"
-        header_content_type = "-H 'Content-Type: application/json'"
-        data_payload = f"-d '{json_payload}'"
-        full_command = f"curl -X POST {url} {header_api_key} {header_content_type} {data_payload}"
-        print(full_command)
+        url = f"{SCORPION_API_URL}/denbi/api/v1/measurements?{urlencode({'service': service_abbreviation})}"
+        argv = ["curl", "-X", "POST", url,
+                "-H", f"X-API-Key: {SCORPION_API_KEY}",
+                "-H", "Content-Type: application/json",
+                "-d", json.dumps(measurements)]
+        print(shlex.join(argv))
         print("-" * 70)
         return
 
-    print(f"INFO: LIVE MODE: Submitting {len(measurements)} measurements for service '{service_abbreviation}'...")
+    # The payload is serialized exactly once; requests sends the bytes as-is and derives Content-Length from them
+    body = _json_dumps(measurements)
+    print(f"INFO: LIVE MODE: Submitting {len(measurements)} measurements ({len(body)} bytes) for service '{service_abbreviation}'...")
     url = f"{SCORPION_API_URL}/denbi/api/v1/measurements"
     params = {"service": service_abbreviation}
     headers = {"X-API-Key": SCORPION_API_KEY, "Content-Type": "application/json"}
     try:
-        response = requests.post(url, params=params, headers=headers, data=json.dumps(measurements))
+        response = SESSION.post(url, params=params, headers=headers, data=body, timeout=30)
         response.raise_for_status()
         print(f"SUCCESS: Successfully submitted data for {service_abbreviation}.")
     except requests.RequestException as e:
@@ -214,14 +407,48 @@ def submit_measurements_to_scorpion(service_abbreviation: str, measurements: lis
 
 def create_measurement(kpi: str, value: any, date: str) -> dict | None:
     """Creates a formatted measurement dictionary, ensuring value is an integer."""
+    if value is None: return None
+    value_type = type(value)
+    # Fast path: integer counters (Matomo hits, GitHub downloads, citations) need no conversion
+    if value_type is int: return {"kpi": kpi, "date": date, "value": value}
     try:
-        if value is None: return None
-        return {"kpi": kpi, "date": date, "value": int(round(float(value)))}
+        # round() on a float already returns an int, only other types need the full conversion
+        return {"kpi": kpi, "date": date, "value": round(value) if value_type is float else int(round(float(value)))}
     except (ValueError, TypeError):
         print(f"WARNING: Could not convert value '{value}' for KPI '{kpi}' to integer. Skipping.")
         return None
 
-def main(user_date: str, is_live_run: bool, selected_services: list | None):
+def build_work_items(services: list, report_date: str, is_historical_mode: bool, use_cache: bool = True) -> list:
+    """
+    Walks the service configuration and lists every external fetch as a (services, kind, fn, args) tuple.
+    All Matomo-backed services share a single bulk request, every other fetch belongs to one service.
+    Each work item issues one request at a time, so citations get one work item per publication title.
+    """
+    work_items = []
+    citation_cache_month = report_date[:7] if use_cache else None
+    matomo_services = [s for s in services if s['source_type'] in MATOMO_SOURCE_TYPE_TO_METHOD]
+    if matomo_services:
+        work_items.append((matomo_services, 'primary', get_matomo_bulk_data, (matomo_services, report_date)))
+
+    for service_info in services:
+        source_details = service_info['source_details']
+
+        # Primary data for non-Matomo sources
+        if service_info['source_type'] == 'github_release_downloads':
+            if not is_historical_mode:
+                tags = source_details.get('tags')  # Safely get the tag, will be None if not present
+                work_items.append(([service_info], 'primary', get_github_release_downloads, (source_details['repo'], tags, use_cache)))
+            else:
+                print(f"INFO: Skipping GitHub downloads fetch for {service_info['display_name']} in historical mode.")
+
+        # Citation data (common to most services)
+        if not is_historical_mode:
+            for title in service_info.get("publications") or []:
+                work_items.append(([service_info], 'citations', get_scholar_citation, (title, citation_cache_month)))
+    return work_items
+
+def main(user_date: str, is_live_run: bool, selected_services: list | None, use_cache: bool = True,
+         async_batch_size: int | None = None):
     """Main function to orchestrate the entire ETL process."""
     now = datetime.now(timezone.utc)
     last_month = now - relativedelta(months=1)
@@ -232,6 +459,10 @@ def main(user_date: str, is_live_run: bool, selected_services: list | None):
 
     services_to_run = SERVICES_CONFIG
     if selected_services:
+        unknown_services = [name for name in selected_services if name not in {s['display_name'] for s in SERVICES_CONFIG}]
+        if unknown_services:
+            print(f"ERROR: The following services are not configured in SERVICES_CONFIG: {unknown_services}")
+            return
         services_to_run = [s for s in SERVICES_CONFIG if s['display_name'] in selected_services]
         print(f"INFO: Running for specified services: {[s['display_name'] for s in services_to_run]}")
     else:
@@ -240,67 +471,70 @@ def main(user_date: str, is_live_run: bool, selected_services: list | None):
     service_map = get_service_abbreviations()
     if not service_map: return
 
+    # Resolve every abbreviation before any data is fetched, so a misconfigured service fails the run up-front
+    missing_names = [s["scorpion_service_name"] for s in services_to_run if s["scorpion_service_name"] not in service_map]
+    if missing_names:
+        print("ERROR: Could not find abbreviations for the following services in ScorPIoN:")
+        for name in missing_names: print(f"  - {name}")
+        return
+    resolved_services = [(s, service_map[s["scorpion_service_name"]]) for s in services_to_run]
+
     matomo_report_date = f"{user_date}-01"
-    
-    for service_info in services_to_run:
-        scorpion_name = service_info["scorpion_service_name"]
-        service_abbreviation = service_map.get(scorpion_name)
-        display_name = service_info["display_name"]
-        
-        print(f"\n--- Processing service: {display_name} ---")
 
-        if not service_abbreviation:
-            print(f"WARNING: Could not find abbreviation for service '{scorpion_name}'. Skipping.")
-            continue
+    # One worker pool is shared by the whole run and fetches are submitted up-front, so the wall-time
+    # is bounded by the slowest requests rather than the sum of all round-trips. At most async_batch_size
+    # work items, each issuing one request at a time, are kept in flight; the oldest one is awaited
+    # before the next is submitted.
+    work_items = build_work_items([s for s, _ in resolved_services], matomo_report_date, is_historical_mode, use_cache)
+    batch_size = async_batch_size or max(1, min(MAX_WORKERS, len(work_items)))
+    with ThreadPoolExecutor(max_workers=batch_size) as executor:
+        futures = {}
+        in_flight = deque()
+        for item_services, kind, fn, fn_args in work_items:
+            if len(in_flight) >= batch_size:
+                wait([in_flight.popleft()])
+            future = executor.submit(fn, *fn_args)
+            in_flight.append(future)
+            for service_info in item_services:
+                futures.setdefault(service_info['display_name'], {}).setdefault(kind, []).append(future)
 
-        intermediate_metrics = {}
-        source_type = service_info['source_type']
-        source_details = service_info['source_details']
-        raw_data = None
-
-        # Step 1: Fetch primary data based on source_type
-        if source_type == 'matomo_page_title':
-            raw_data = get_matomo_page_title_data(source_details['label'], matomo_report_date)
-            if raw_data:
-                for api_key, im_name in MATOMO_PAGE_TITLE_TO_INTERMEDIATE.items():
-                    value = raw_data.get(api_key, 0) if api_key != 'nb_actions_per_visit' else raw_data.get('nb_hits', 0) / raw_data.get('nb_visits', 1)
-                    intermediate_metrics[im_name] = value
-        
-        elif source_type == 'matomo_site_summary':
-            raw_data = get_matomo_summary_data(matomo_report_date)
-            if raw_data:
-                for api_key, im_name in MATOMO_SUMMARY_TO_INTERMEDIATE.items():
-                    intermediate_metrics[im_name] = raw_data.get(api_key, 0)
-        
-        elif source_type == 'matomo_download':
-            raw_data = get_matomo_download_data(source_details['download_url'], matomo_report_date)
-            if raw_data:
-                intermediate_metrics['Downloads'] = raw_data.get('nb_hits', 0)
-        
-        elif source_type == 'github_release_downloads':
-            if not is_historical_mode:
-                repo = source_details['repo']
-                tags = source_details.get('tags')  # Safely get the tag, will be None if not present
-                intermediate_metrics['Downloads'] = get_github_release_downloads(repo, tags)
-            else:
-                print("INFO: Skipping GitHub downloads fetch in historical mode.")
+        for service_info, service_abbreviation in resolved_services:
+            display_name = service_info["display_name"]
+            print(f"\n--- Processing service: {display_name} ---")
+
+            source_type = service_info['source_type']
+            service_futures = futures.get(display_name, {})
+            raw_data = service_futures['primary'][0].result() if 'primary' in service_futures else None
+            if source_type in MATOMO_SOURCE_TYPE_TO_METHOD and raw_data is not None:
+                raw_data = raw_data.get(display_name)
 
-        # Step 2: Fetch citation data (common to most services)
-        if not is_historical_mode and "publications" in service_info and service_info["publications"]:
-            intermediate_metrics['Citations'] = get_scholar_citations(service_info["publications"])
+            # Step 1: Map primary data to ScorPIoN KPIs based on source_type
+            # Measurements whose value cannot be converted are dropped as they are created, not in a later pass
+            measurements = []
+            add_measurement = measurements.append
+            if source_type == 'github_release_downloads':
+                if raw_data is not None and (m := create_measurement(INTERMEDIATE_NAME_TO_SCORPION_KPI['Downloads'], raw_data, user_date)) is not None:
+                    add_measurement(m)
+            elif raw_data:
+                if source_type == 'matomo_page_title':
+                    # Page titles do not report actions per visit, so it is derived once from hits and visits
+                    nb_visits = raw_data.get('nb_visits', 1)
+                    raw_data = {**raw_data, 'nb_actions_per_visit': raw_data.get('nb_hits', 0) / nb_visits if nb_visits else 0}
+                for api_key, scorpion_kpi, emit_pageviews in KPI_PIPELINE[source_type]:
+                    value = raw_data.get(api_key, 0)
+                    if (m := create_measurement(scorpion_kpi, value, user_date)) is not None:
+                        add_measurement(m)
+                        # Special case: 'Actions' KPI is also submitted as 'Pageviews' for some services
+                        if emit_pageviews:
+                            add_measurement({**m, "kpi": 'Pageviews'})
 
-        # Step 3: Map intermediate metrics to ScorPIoN payload
-        measurements_payload = []
-        for intermediate_name, value in intermediate_metrics.items():
-            scorpion_kpi = INTERMEDIATE_NAME_TO_SCORPION_KPI.get(intermediate_name)
-            if scorpion_kpi:
-                measurements_payload.append(create_measurement(scorpion_kpi, value, user_date))
-                # Special case: 'Actions' KPI is also submitted as 'Pageviews' for some services
-                if intermediate_name == 'Actions' and source_type in ['matomo_page_title', 'matomo_site_summary']:
-                    measurements_payload.append(create_measurement('Pageviews', value, user_date))
+            # Step 2: Collect citation data (common to most services)
+            if 'citations' in service_futures:
+                citations = sum(future.result() for future in service_futures['citations'])
+                if (m := create_measurement(INTERMEDIATE_NAME_TO_SCORPION_KPI['Citations'], citations, user_date)) is not None:
+                    add_measurement(m)
 
-        valid_measurements = [m for m in measurements_payload if m is not None]
-        submit_measurements_to_scorpion(service_abbreviation, valid_measurements, is_live_run)
+            submit_measurements_to_scorpion(service_abbreviation, measurements, is_live_run)
 
 def check_env_vars():
     """Checks for required environment variables and exits if any are missing."""
@@ -321,11 +555,15 @@ if __name__ == "__main__":
     parser.add_argument("--date", type=str, default=default_date, help=f"The date for the report in YYYY-MM format. Defaults to last month ({default_date}).")
     parser.add_argument("--live", action='store_true', help="Run in live submission mode. If not set, the script will perform a dry run and print curl commands.")
     parser.add_argument("--services", nargs='*', help="Specify one or more services to run by their display_name (e.g., 'Helixer' 'Trimmomatic'). If not provided, all services will be processed.")
+    parser.add_argument("--no-cache", action='store_true', help=f"Ignore and do not update the on-disk citation and GitHub release caches in {CACHE_DIR}.")
+    parser.add_argument("--async-batch-size", type=int, help=f"Maximum number of fetches run at once: the Matomo bulk request, each GitHub release listing and each SerpApi citation query. Defaults to the number of fetches, capped at {MAX_WORKERS}.")
     
     args = parser.parse_args()
+    if args.async_batch_size is not None and args.async_batch_size < 1:
+        parser.error("--async-batch-size must be a positive integer.")
     
     try:
         datetime.strptime(args.date, '%Y-%m')
-        main(args.date, args.live, args.services)
+        main(args.date, args.live, args.services, use_cache=not args.no_cache, async_batch_size=args.async_batch_size)
     except ValueError:
         print("ERROR: Date format is incorrect. Please use YYYY-MM.")
\ No newline at end of file